@@ -5,10 +5,21 @@ from dotenv import load_dotenv
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Motor runs blocking PyMongo calls on a thread pool sized from this variable
+# when motor is first imported; its default (5 per CPU) thrashes under the
+# analysis fan-out. Import this module before motor for the cap to apply.
+os.environ.setdefault('MOTOR_MAX_WORKERS', '4')
+
 class Settings:
     # MongoDB
     MONGO_URL = os.environ.get('MONGO_URL')
     DB_NAME = os.environ.get('DB_NAME', 'code_intelligence')
+    # Motor runs every operation on its MOTOR_MAX_WORKERS threads, so no more
+    # sockets than that can be in use at once; pre-warm and cap at that size
+    MOTOR_MAX_WORKERS = int(os.environ['MOTOR_MAX_WORKERS'])
+    MONGO_MIN_POOL_SIZE = MOTOR_MAX_WORKERS
+    MONGO_MAX_POOL_SIZE = MOTOR_MAX_WORKERS
+    MONGO_MAX_IDLE_TIME_MS = 60000
     
     # OpenRouter API
     OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY', '')
@@ -18,6 +29,26 @@ class Settings:
     TEMP_REPO_PATH = '/tmp/code_repos'
     MAX_FILE_SIZE = 1024 * 1024  # 1MB
     SUPPORTED_EXTENSIONS = ['.py', '.js', '.jsx', '.ts', '.tsx', '.json']
+    IGNORED_DIRS = ['.git', 'node_modules', '__pycache__', 'dist', 'build', '.venv', 'venv']
+    CODE_MAP_INSERT_BATCH_SIZE = 500
+    # Source tokens sent per file for AI analysis; no more than the old
+    # 3000-character cut (750 tokens at AI_CHARS_PER_TOKEN)
+    AI_MAX_CODE_TOKENS = 750
+    AI_CHARS_PER_TOKEN = 4  # Rough ratio for source code, used without a tokenizer
+    AI_MAX_CONTEXT_FILES = 20  # Code maps described to the model per requirement
+    
+    # Concurrency
+    BACKGROUND_JOB_WORKERS = 4  # Project/requirement analyses run at once
+    AGENT_TASK_CONCURRENCY = 4
+    FILE_ANALYSIS_CONCURRENCY = 16
+    AI_REQUEST_CONCURRENCY = 8
+    # Fail analyses left 'analyzing' by a previous run at startup. Only safe
+    # when a single server process owns the database: with several uvicorn
+    # workers or replicas it would fail jobs another process is still running.
+    RECOVER_INTERRUPTED_JOBS = os.environ.get('RECOVER_INTERRUPTED_JOBS', 'false').lower() == 'true'
+    
+    # Mongo cursors
+    CURSOR_BATCH_SIZE = 200
     
     # CORS
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*').split(',')
@@ -0,0 +1,41 @@
+"""One-off migration of legacy ISO-string timestamps to BSON dates.
+
+Documents written before timestamps were stored natively keep their dates as
+ISO strings. The API now reads dates straight from Mongo, so convert them in
+place once:
+
+    python migrate_datetimes.py
+"""
+from config import settings
+from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATETIME_FIELDS = {
+    "projects": ["created_at", "analysis_completed_at"],
+    "code_maps": ["created_at"],
+    "requirements": ["created_at"],
+    "agent_tasks": ["created_at", "completed_at"],
+    "recommendations": ["created_at"],
+}
+
+async def migrate():
+    client = AsyncIOMotorClient(settings.MONGO_URL)
+    db = client[settings.DB_NAME]
+    try:
+        for collection, fields in DATETIME_FIELDS.items():
+            for field in fields:
+                # Pipeline update so the conversion runs server-side
+                result = await db[collection].update_many(
+                    {field: {"$type": "string"}},
+                    [{"$set": {field: {"$toDate": f"${field}"}}}]
+                )
+                logger.info(f"{collection}.{field}: converted {result.modified_count} documents")
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
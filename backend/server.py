@@ -1,27 +1,54 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
+# Must precede the motor import; see MOTOR_MAX_WORKERS in config
+from config import settings
+from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Type
 from datetime import datetime, timezone
+from bson import encode as bson_encode
+from bson.raw_bson import RawBSONDocument
+import asyncio
+import orjson
 import uuid
 import logging
 import os
 from pathlib import Path
-from config import settings
 
 # Import analysis modules
 from services.github_service import GitHubService
 from services.ast_parser import ASTParser
 from services.ai_analyzer import AIAnalyzer
 from services.agent_orchestrator import AgentOrchestrator
+from services.task_queue import TaskQueue
 
 # MongoDB connection
-client = AsyncIOMotorClient(settings.MONGO_URL)
+# tz_aware so stored UTC datetimes are read back as aware datetimes;
+# minPoolSize opens connections in the background before the first request
+client = AsyncIOMotorClient(
+    settings.MONGO_URL,
+    tz_aware=True,
+    minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+    maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+    maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS
+)
 db = client[settings.DB_NAME]
 
+# Runs project and requirement analyses outside the request cycle
+task_queue = TaskQueue(settings.BACKGROUND_JOB_WORKERS)
+
+# Shared services; their clients, caches and concurrency limits are process-wide
+_github_service = GitHubService()
+_ast_parser = ASTParser()
+_ai_analyzer = AIAnalyzer()
+_orchestrator = AgentOrchestrator(db)
+
 # Create the main app
-app = FastAPI(title="Code Intelligence Platform")
+# orjson encodes datetimes and nested dicts in C for every route by default
+app = FastAPI(title="Code Intelligence Platform", default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # Configure logging
@@ -93,6 +120,42 @@ class Recommendation(BaseModel):
 
 # ==================== ROUTES ====================
 
+CODE_MAP_LISTING_INDEX = [("project_id", 1), ("file_path", 1), ("file_type", 1), ("line_count", 1)]
+
+def trusted_list_response(model: Type[BaseModel], docs: List[Dict[str, Any]]) -> ORJSONResponse:
+    """Serialize documents we wrote ourselves without re-validating them.
+
+    Returning a Response bypasses FastAPI's response_model validation; the
+    response_model on the route is kept for the OpenAPI schema.
+    """
+    return ORJSONResponse(content=[
+        model.model_construct(**doc).model_dump(mode='json') for doc in docs
+    ])
+
+async def trusted_stream_response(model: Type[BaseModel], cursor) -> StreamingResponse:
+    """Stream a cursor as a JSON array, one document at a time.
+
+    Only one cursor batch is held in memory, and the first bytes go out as
+    soon as the first batch is decoded.
+    """
+    # Run the query before the 200 status line is committed, so a bad query
+    # or an unreachable database still fails the request with a 500
+    try:
+        first = await cursor.next()
+    except StopAsyncIteration:
+        return ORJSONResponse(content=[])
+    
+    def encode(doc: Dict[str, Any]) -> bytes:
+        return orjson.dumps(model.model_construct(**doc).model_dump(mode='json'))
+    
+    async def body():
+        yield b"[" + encode(first)
+        async for doc in cursor:
+            yield b"," + encode(doc)
+        yield b"]"
+    
+    return StreamingResponse(body(), media_type="application/json")
+
 @api_router.get("/")
 async def root():
     return {"message": "Code Intelligence Platform API", "version": "1.0.0"}
@@ -100,18 +163,44 @@ async def root():
 # ===== PROJECT ROUTES =====
 
 @api_router.post("/projects", response_model=Project)
-async def create_project(project_data: ProjectCreate, background_tasks: BackgroundTasks):
+async def create_project(project_data: ProjectCreate):
     """Create new project and start analysis"""
-    project = Project(**project_data.model_dump())
-    doc = project.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    if doc.get('analysis_completed_at'):
-        doc['analysis_completed_at'] = doc['analysis_completed_at'].isoformat()
+    # Analysis is queued in the same request, so the project starts out as
+    # analyzing and the background task only writes the terminal status
+    project = Project(**project_data.model_dump(), status="analyzing")
+    doc = project.model_dump(exclude_none=True)
+    
+    # Keyed on the repository URL so repeated submits (double clicks, retries)
+    # return the in-flight or finished project instead of starting another
+    # analysis; a failed project is re-analyzed below
+    try:
+        result = await db.projects.update_one(
+            {"github_url": project.github_url},
+            {"$setOnInsert": doc},
+            upsert=True
+        )
+        created = result.upserted_id is not None
+    except DuplicateKeyError:
+        # Lost an upsert race to a concurrent request for the same URL
+        created = False
     
-    await db.projects.insert_one(doc)
+    if not created:
+        # Atomically claim a failed project so only one resubmit retries it
+        retried = await db.projects.find_one_and_update(
+            {"github_url": project.github_url, "status": "failed"},
+            {"$set": {"status": "analyzing"}, "$unset": {"analysis_completed_at": ""}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not retried:
+            return await db.projects.find_one({"github_url": project.github_url}, {"_id": 0})
+        
+        # Drop code maps a partial earlier run may have written
+        await db.code_maps.delete_many({"project_id": retried['id']})
+        await task_queue.enqueue(analyze_project, retried['id'])
+        return retried
     
     # Start analysis in background
-    background_tasks.add_task(analyze_project, project.id)
+    await task_queue.enqueue(analyze_project, project.id)
     
     return project
 
@@ -119,12 +208,7 @@ async def create_project(project_data: ProjectCreate, background_tasks: Backgrou
 async def get_projects():
     """Get all projects"""
     projects = await db.projects.find({}, {"_id": 0}).to_list(1000)
-    for p in projects:
-        if isinstance(p.get('created_at'), str):
-            p['created_at'] = datetime.fromisoformat(p['created_at'])
-        if p.get('analysis_completed_at') and isinstance(p['analysis_completed_at'], str):
-            p['analysis_completed_at'] = datetime.fromisoformat(p['analysis_completed_at'])
-    return projects
+    return trusted_list_response(Project, projects)
 
 @api_router.get("/projects/{project_id}", response_model=Project)
 async def get_project(project_id: str):
@@ -132,10 +216,6 @@ async def get_project(project_id: str):
     project = await db.projects.find_one({"id": project_id}, {"_id": 0})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    if isinstance(project.get('created_at'), str):
-        project['created_at'] = datetime.fromisoformat(project['created_at'])
-    if project.get('analysis_completed_at') and isinstance(project['analysis_completed_at'], str):
-        project['analysis_completed_at'] = datetime.fromisoformat(project['analysis_completed_at'])
     return project
 
 # ===== CODE MAP ROUTES =====
@@ -143,56 +223,89 @@ async def get_project(project_id: str):
 @api_router.get("/code-maps/{project_id}", response_model=List[CodeMap])
 async def get_code_maps(project_id: str):
     """Get code maps for a project"""
-    code_maps = await db.code_maps.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-    for cm in code_maps:
-        if isinstance(cm.get('created_at'), str):
-            cm['created_at'] = datetime.fromisoformat(cm['created_at'])
-    return code_maps
+    cursor = db.code_maps.find({"project_id": project_id}, {"_id": 0}).limit(1000).batch_size(settings.CURSOR_BATCH_SIZE)
+    return await trusted_stream_response(CodeMap, cursor)
+
+@api_router.get("/code-maps/{project_id}/index")
+async def get_code_map_index(project_id: str):
+    """Get the file listing of a project's code maps"""
+    # Only indexed fields are projected, so the query is covered and
+    # Mongo answers it from the index without fetching documents
+    files = await db.code_maps.find(
+        {"project_id": project_id},
+        {"_id": 0, "file_path": 1, "file_type": 1, "line_count": 1}
+    ).hint(CODE_MAP_LISTING_INDEX).to_list(None)
+    return files
+
+@api_router.get("/code-maps/{project_id}/file", response_model=CodeMap)
+async def get_code_map_file(project_id: str, path: str):
+    """Get the full code map of a single file"""
+    code_map = await db.code_maps.find_one({"project_id": project_id, "file_path": path}, {"_id": 0})
+    if not code_map:
+        raise HTTPException(status_code=404, detail="Code map not found")
+    return code_map
 
 @api_router.get("/code-maps/{project_id}/summary")
 async def get_code_map_summary(project_id: str):
     """Get summary of code maps"""
-    code_maps = await db.code_maps.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
+    # Aggregate server-side so heavy fields (ast_analysis, ai_analysis,
+    # function/class details) never leave the database
+    pipeline = [
+        {"$match": {"project_id": project_id}},
+        {"$limit": 1000},
+        {"$project": {
+            "_id": 0,
+            "file_path": 1,
+            "file_type": {"$ifNull": ["$file_type", "unknown"]},
+            "line_count": {"$ifNull": ["$line_count", 0]},
+            "n_functions": {"$size": {"$ifNull": ["$functions", []]}},
+            "n_classes": {"$size": {"$ifNull": ["$classes", []]}}
+        }},
+        {"$facet": {
+            "totals": [{"$group": {
+                "_id": None,
+                "total_files": {"$sum": 1},
+                "total_functions": {"$sum": "$n_functions"},
+                "total_classes": {"$sum": "$n_classes"},
+                "total_lines": {"$sum": "$line_count"}
+            }}],
+            "file_types": [{"$group": {"_id": "$file_type", "count": {"$sum": 1}}}],
+            "files": [{"$project": {
+                "path": "$file_path",
+                "type": "$file_type",
+                "functions": "$n_functions",
+                "classes": "$n_classes",
+                "lines": "$line_count"
+            }}]
+        }}
+    ]
+    facets = (await db.code_maps.aggregate(pipeline).to_list(1))[0]
+    totals = facets['totals'][0] if facets['totals'] else {}
     
     summary = {
-        "total_files": len(code_maps),
-        "file_types": {},
-        "total_functions": 0,
-        "total_classes": 0,
-        "total_lines": 0,
-        "files": []
+        "total_files": totals.get('total_files', 0),
+        "file_types": {ft['_id']: ft['count'] for ft in facets['file_types']},
+        "total_functions": totals.get('total_functions', 0),
+        "total_classes": totals.get('total_classes', 0),
+        "total_lines": totals.get('total_lines', 0),
+        "files": facets['files']
     }
     
-    for cm in code_maps:
-        file_type = cm.get('file_type', 'unknown')
-        summary['file_types'][file_type] = summary['file_types'].get(file_type, 0) + 1
-        summary['total_functions'] += len(cm.get('functions', []))
-        summary['total_classes'] += len(cm.get('classes', []))
-        summary['total_lines'] += cm.get('line_count', 0)
-        
-        summary['files'].append({
-            "path": cm['file_path'],
-            "type": cm['file_type'],
-            "functions": len(cm.get('functions', [])),
-            "classes": len(cm.get('classes', [])),
-            "lines": cm.get('line_count', 0)
-        })
-    
     return summary
 
 # ===== REQUIREMENT ROUTES =====
 
 @api_router.post("/requirements", response_model=Requirement)
-async def create_requirement(req_data: RequirementCreate, background_tasks: BackgroundTasks):
+async def create_requirement(req_data: RequirementCreate):
     """Create requirement and analyze"""
-    requirement = Requirement(**req_data.model_dump())
-    doc = requirement.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    # Same as projects: queued immediately, so stored as analyzing up front
+    requirement = Requirement(**req_data.model_dump(), status="analyzing")
+    doc = requirement.model_dump(exclude_none=True)
     
     await db.requirements.insert_one(doc)
     
     # Start requirement analysis
-    background_tasks.add_task(analyze_requirement, requirement.id)
+    await task_queue.enqueue(analyze_requirement, requirement.id)
     
     return requirement
 
@@ -200,10 +313,7 @@ async def create_requirement(req_data: RequirementCreate, background_tasks: Back
 async def get_requirements(project_id: str):
     """Get requirements for a project"""
     requirements = await db.requirements.find({"project_id": project_id}, {"_id": 0}).to_list(1000)
-    for req in requirements:
-        if isinstance(req.get('created_at'), str):
-            req['created_at'] = datetime.fromisoformat(req['created_at'])
-    return requirements
+    return trusted_list_response(Requirement, requirements)
 
 @api_router.get("/requirements/detail/{requirement_id}", response_model=Requirement)
 async def get_requirement(requirement_id: str):
@@ -211,8 +321,6 @@ async def get_requirement(requirement_id: str):
     requirement = await db.requirements.find_one({"id": requirement_id}, {"_id": 0})
     if not requirement:
         raise HTTPException(status_code=404, detail="Requirement not found")
-    if isinstance(requirement.get('created_at'), str):
-        requirement['created_at'] = datetime.fromisoformat(requirement['created_at'])
     return requirement
 
 # ===== AGENT TASK ROUTES =====
@@ -221,12 +329,7 @@ async def get_requirement(requirement_id: str):
 async def get_agent_tasks(requirement_id: str):
     """Get agent tasks for a requirement"""
     tasks = await db.agent_tasks.find({"requirement_id": requirement_id}, {"_id": 0}).to_list(1000)
-    for task in tasks:
-        if isinstance(task.get('created_at'), str):
-            task['created_at'] = datetime.fromisoformat(task['created_at'])
-        if task.get('completed_at') and isinstance(task['completed_at'], str):
-            task['completed_at'] = datetime.fromisoformat(task['completed_at'])
-    return tasks
+    return trusted_list_response(AgentTask, tasks)
 
 # ===== RECOMMENDATION ROUTES =====
 
@@ -234,74 +337,81 @@ async def get_agent_tasks(requirement_id: str):
 async def get_recommendations(requirement_id: str):
     """Get recommendations for a requirement"""
     recommendations = await db.recommendations.find({"requirement_id": requirement_id}, {"_id": 0}).to_list(1000)
-    for rec in recommendations:
-        if isinstance(rec.get('created_at'), str):
-            rec['created_at'] = datetime.fromisoformat(rec['created_at'])
-    return recommendations
+    return trusted_list_response(Recommendation, recommendations)
 
 # ==================== BACKGROUND TASKS ====================
 
+SUPPORTED_EXTENSIONS = frozenset(settings.SUPPORTED_EXTENSIONS)
+IGNORED_DIRS = frozenset(settings.IGNORED_DIRS)
+
+def iter_source_files(root: str):
+    """Yield supported files under root, pruning vendored and build directories"""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                # Symlinks are not followed so analysis stays inside the checkout
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORED_DIRS:
+                        stack.append(entry.path)
+                else:
+                    # Filter on the name (same rules as Path.suffix) before
+                    # building a Path; is_file() reuses the cached d_type
+                    name = entry.name
+                    dot = name.rfind('.')
+                    if (
+                        0 < dot < len(name) - 1
+                        and name[dot:] in SUPPORTED_EXTENSIONS
+                        and entry.is_file(follow_symlinks=False)
+                    ):
+                        yield Path(entry.path)
+
 async def analyze_project(project_id: str):
     """Background task to analyze project"""
     try:
         logger.info(f"Starting analysis for project {project_id}")
         
-        # Update status
-        await db.projects.update_one(
-            {"id": project_id},
-            {"$set": {"status": "analyzing"}}
-        )
-        
         # Get project
         project = await db.projects.find_one({"id": project_id})
         if not project:
             raise Exception("Project not found")
         
         # Clone repository
-        github_service = GitHubService()
-        repo_path = await github_service.clone_repo(project['github_url'], project_id)
+        repo_path = await _github_service.clone_repo(project['github_url'], project_id)
         
         # Parse files
-        ast_parser = ASTParser()
-        ai_analyzer = AIAnalyzer()
+        # The directory walk is blocking, so run it off the event loop
+        files = await asyncio.to_thread(lambda: list(iter_source_files(repo_path)))
+        semaphore = asyncio.Semaphore(settings.FILE_ANALYSIS_CONCURRENCY)
+        
+        # Write code maps in batches as files finish, so memory stays bounded
+        # by one batch and the UI sees files appear while analysis runs
+        batch = []
+        for next_doc in asyncio.as_completed([
+            analyze_file(project_id, repo_path, file_path, semaphore)
+            for file_path in files
+        ]):
+            doc = await next_doc
+            if doc is None:
+                continue
+            batch.append(doc)
+            if len(batch) >= settings.CODE_MAP_INSERT_BATCH_SIZE:
+                await insert_code_maps(project_id, batch)
+                batch = []
+        if batch:
+            await insert_code_maps(project_id, batch)
         
-        files = list(Path(repo_path).rglob('*'))
-        for file_path in files:
-            if file_path.is_file() and file_path.suffix in settings.SUPPORTED_EXTENSIONS:
-                try:
-                    # AST parsing
-                    ast_result = await ast_parser.parse_file(str(file_path))
-                    
-                    # AI analysis
-                    ai_result = await ai_analyzer.analyze_code(str(file_path))
-                    
-                    # Create code map
-                    code_map = CodeMap(
-                        project_id=project_id,
-                        file_path=str(file_path.relative_to(repo_path)),
-                        file_type=file_path.suffix,
-                        ast_analysis=ast_result['ast_data'],
-                        ai_analysis=ai_result,
-                        functions=ast_result['functions'],
-                        classes=ast_result['classes'],
-                        imports=ast_result['imports'],
-                        dependencies=ast_result['dependencies'],
-                        line_count=ast_result['line_count']
-                    )
-                    
-                    doc = code_map.model_dump()
-                    doc['created_at'] = doc['created_at'].isoformat()
-                    await db.code_maps.insert_one(doc)
-                    
-                except Exception as e:
-                    logger.error(f"Error parsing {file_path}: {str(e)}")
+        logger.info(
+            f"AST cache totals after project {project_id}: "
+            f"{_ast_parser.cache_hits} hits, {_ast_parser.cache_misses} misses"
+        )
         
         # Update project status
         await db.projects.update_one(
             {"id": project_id},
             {"$set": {
                 "status": "completed",
-                "analysis_completed_at": datetime.now(timezone.utc).isoformat()
+                "analysis_completed_at": datetime.now(timezone.utc)
             }}
         )
         
@@ -314,31 +424,74 @@ async def analyze_project(project_id: str):
             {"$set": {"status": "failed"}}
         )
 
+async def analyze_file(
+    project_id: str,
+    repo_path: str,
+    file_path: Path,
+    semaphore: asyncio.Semaphore
+) -> Optional[RawBSONDocument]:
+    """Parse and analyze a single repository file into a code map document"""
+    async with semaphore:
+        try:
+            # AST parsing and AI analysis are independent, so overlap the
+            # local parse with the model round-trip
+            ast_result, ai_result = await asyncio.gather(
+                _ast_parser.parse_file(str(file_path)),
+                _ai_analyzer.analyze_code(str(file_path))
+            )
+            
+            # Create code map
+            code_map = CodeMap(
+                project_id=project_id,
+                file_path=str(file_path.relative_to(repo_path)),
+                file_type=file_path.suffix,
+                ast_analysis=ast_result['ast_data'],
+                ai_analysis=ai_result,
+                functions=ast_result['functions'],
+                classes=ast_result['classes'],
+                imports=ast_result['imports'],
+                dependencies=ast_result['dependencies'],
+                line_count=ast_result['line_count']
+            )
+            
+            # Encode to BSON here so insert_many sends the bytes as-is
+            return RawBSONDocument(bson_encode(code_map.model_dump(exclude_none=True)))
+            
+        except Exception as e:
+            logger.error(f"Error parsing {file_path}: {str(e)}")
+            return None
+
+async def insert_code_maps(project_id: str, docs: List[RawBSONDocument]):
+    """Insert a batch of code maps, tolerating individual document failures"""
+    try:
+        await db.code_maps.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        # Unordered inserts still write the rest of the batch; log the
+        # rejections (without the documents PyMongo attaches as 'op')
+        write_errors = e.details['writeErrors']
+        logger.error(
+            f"Failed to store {len(write_errors)} code maps for project {project_id}: "
+            f"{[(err['index'], err['code'], err['errmsg']) for err in write_errors]}"
+        )
+
 async def analyze_requirement(requirement_id: str):
     """Background task to analyze requirement"""
     try:
         logger.info(f"Starting requirement analysis {requirement_id}")
         
-        # Update status
-        await db.requirements.update_one(
-            {"id": requirement_id},
-            {"$set": {"status": "analyzing"}}
-        )
-        
         # Get requirement
         requirement = await db.requirements.find_one({"id": requirement_id})
         if not requirement:
             raise Exception("Requirement not found")
         
-        # Get code maps for project
+        # Get code maps for project, limited to the files and fields the analyzer reads
         code_maps = await db.code_maps.find(
             {"project_id": requirement['project_id']},
-            {"_id": 0}
-        ).to_list(1000)
+            {"_id": 0, "file_path": 1, "file_type": 1, "functions.name": 1, "classes.name": 1}
+        ).limit(settings.AI_MAX_CONTEXT_FILES).to_list(None)
         
         # Analyze with AI
-        ai_analyzer = AIAnalyzer()
-        analysis_result = await ai_analyzer.analyze_requirement(
+        analysis_result = await _ai_analyzer.analyze_requirement(
             requirement['prompt'],
             code_maps
         )
@@ -354,11 +507,10 @@ async def analyze_requirement(requirement_id: str):
         )
         
         # Create agent tasks
-        orchestrator = AgentOrchestrator(db)
-        await orchestrator.create_tasks(requirement_id, analysis_result)
+        await _orchestrator.create_tasks(requirement_id, analysis_result)
         
         # Process agent tasks
-        await orchestrator.process_tasks(requirement_id)
+        await _orchestrator.process_tasks(requirement_id)
         
         logger.info(f"Requirement analysis completed {requirement_id}")
         
@@ -373,14 +525,54 @@ async def analyze_requirement(requirement_id: str):
 app.include_router(api_router)
 
 # CORS
+# The frontend sends no cookies, so credentials stay off and a wildcard origin
+# is answered with a static header; max_age lets browsers cache preflights
 app.add_middleware(
     CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=frozenset(settings.CORS_ORIGINS),
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type"],
+    max_age=86400,
 )
 
+@app.on_event("startup")
+async def create_indexes():
+    # Documents are addressed by their UUID `id`, never by `_id`
+    for collection in (db.projects, db.code_maps, db.requirements, db.agent_tasks, db.recommendations):
+        await collection.create_index("id", unique=True)
+    
+    # Makes project creation idempotent per repository; databases that already
+    # hold duplicates keep working, the upsert in create_project still dedupes
+    try:
+        await db.projects.create_index("github_url", unique=True)
+    except OperationFailure as e:
+        logger.warning(f"Could not create unique github_url index: {str(e)}")
+    
+    # Covers the file listing; its project_id prefix serves the other lookups
+    await db.code_maps.create_index(CODE_MAP_LISTING_INDEX)
+    await db.requirements.create_index("project_id")
+    await db.recommendations.create_index("requirement_id")
+    # Also serves plain requirement_id lookups via its prefix
+    await db.agent_tasks.create_index([("requirement_id", 1), ("status", 1)])
+
+@app.on_event("startup")
+async def start_task_queue():
+    # The queue lives in memory, so in a single-process deployment anything
+    # still analyzing was dropped or cancelled by the last shutdown; fail it so
+    # the UI stops polling and the project can be resubmitted. Opt-in, since
+    # other processes sharing the database may still be running those jobs.
+    if settings.RECOVER_INTERRUPTED_JOBS:
+        for collection in (db.projects, db.requirements):
+            result = await collection.update_many(
+                {"status": "analyzing"},
+                {"$set": {"status": "failed"}}
+            )
+            if result.modified_count:
+                logger.warning(f"Marked {result.modified_count} interrupted {collection.name} as failed")
+    
+    await task_queue.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await task_queue.stop()
     client.close()
@@ -1,7 +1,9 @@
+import asyncio
 import logging
 from typing import Dict, Any
 from datetime import datetime, timezone
 import uuid
+from config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +16,10 @@ class AgentOrchestrator:
     async def create_tasks(self, requirement_id: str, analysis_result: Dict[str, Any]):
         """Create agent tasks based on analysis"""
         affected = analysis_result.get('affected_components', {})
+        now = datetime.now(timezone.utc)
         
+        # Unset optional fields (output_data, completed_at) are left out of
+        # the stored documents, matching the exclude_none model writes
         tasks = []
         
         # Frontend agent tasks
@@ -28,8 +33,7 @@ class AgentOrchestrator:
                     'components': affected['frontend'],
                     'analysis': analysis_result
                 },
-                'output_data': None,
-                'created_at': datetime.now(timezone.utc).isoformat()
+                'created_at': now
             })
         
         # Backend agent tasks
@@ -43,8 +47,7 @@ class AgentOrchestrator:
                     'services': affected['backend'],
                     'analysis': analysis_result
                 },
-                'output_data': None,
-                'created_at': datetime.now(timezone.utc).isoformat()
+                'created_at': now
             })
         
         # Database agent tasks
@@ -58,13 +61,12 @@ class AgentOrchestrator:
                     'models': affected['database'],
                     'analysis': analysis_result
                 },
-                'output_data': None,
-                'created_at': datetime.now(timezone.utc).isoformat()
+                'created_at': now
             })
         
         # Insert all tasks
         if tasks:
-            await self.db.agent_tasks.insert_many(tasks)
+            await self.db.agent_tasks.insert_many(tasks, ordered=False)
         
         logger.info(f"Created {len(tasks)} agent tasks for requirement {requirement_id}")
     
@@ -74,7 +76,12 @@ class AgentOrchestrator:
             {'requirement_id': requirement_id, 'status': 'pending'}
         ).to_list(100)
         
-        for task in tasks:
+        semaphore = asyncio.Semaphore(settings.AGENT_TASK_CONCURRENCY)
+        await asyncio.gather(*(self._process_guarded(task, semaphore) for task in tasks))
+    
+    async def _process_guarded(self, task: Dict[str, Any], semaphore: asyncio.Semaphore):
+        """Process single task under the concurrency limit, logging failures"""
+        async with semaphore:
             try:
                 await self._process_single_task(task)
             except Exception as e:
@@ -84,12 +91,7 @@ class AgentOrchestrator:
         """Process single agent task"""
         task_id = task['id']
         agent_type = task['agent_type']
-        
-        # Update status
-        await self.db.agent_tasks.update_one(
-            {'id': task_id},
-            {'$set': {'status': 'processing'}}
-        )
+        now = datetime.now(timezone.utc)
         
         # Simulate agent processing
         output_data = {
@@ -105,20 +107,22 @@ class AgentOrchestrator:
         }
         
         # Create recommendations
-        for rec in output_data['recommendations']:
-            recommendation = {
+        recommendations = [
+            {
                 'id': str(uuid.uuid4()),
                 'requirement_id': task['requirement_id'],
                 'component_type': agent_type,
                 'file_path': rec['file'],
                 'change_type': 'modify',
-                'original_code': None,
                 'recommended_code': '# New code here',
                 'explanation': rec['reason'],
                 'confidence_score': 0.85,
-                'created_at': datetime.now(timezone.utc).isoformat()
+                'created_at': now
             }
-            await self.db.recommendations.insert_one(recommendation)
+            for rec in output_data['recommendations']
+        ]
+        if recommendations:
+            await self.db.recommendations.insert_many(recommendations, ordered=False)
         
         # Update task
         await self.db.agent_tasks.update_one(
@@ -126,7 +130,7 @@ class AgentOrchestrator:
             {'$set': {
                 'status': 'completed',
                 'output_data': output_data,
-                'completed_at': datetime.now(timezone.utc).isoformat()
+                'completed_at': now
             }}
         )
         
@@ -1,25 +1,39 @@
+import asyncio
 import logging
-from typing import Dict, List, Any
-from openai import OpenAI
+import re
+from typing import Dict, List, Any, Optional
+import orjson
+import tiktoken
+from openai import AsyncOpenAI
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+# Markdown code fence models often wrap JSON answers in
+_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
 class AIAnalyzer:
     """AI-powered code analysis using OpenRouter"""
     
     def __init__(self):
-        self.client = OpenAI(
+        self.client = AsyncOpenAI(
             base_url="https://openrouter.ai/api/v1",
             api_key=settings.OPENROUTER_API_KEY
         )
         self.model = settings.OPENROUTER_MODEL
+        # Keep concurrent requests within OpenRouter rate limits
+        self._request_semaphore = asyncio.Semaphore(settings.AI_REQUEST_CONCURRENCY)
+        self._encoding = None
+        self._encoding_loaded = False
+        self._encoding_lock = asyncio.Lock()
     
     async def analyze_code(self, file_path: str) -> Dict[str, Any]:
         """Analyze code file with AI"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()[:3000]  # Limit content
+                # Twice the expected size, so dense code still fills the token budget
+                content = f.read(settings.AI_MAX_CODE_TOKENS * settings.AI_CHARS_PER_TOKEN * 2)
+            content = await self._truncate_to_token_budget(content)
             
             prompt = f"""Analyze this code file and provide:
 1. Purpose and functionality
@@ -32,14 +46,15 @@ Code:
 
 Provide analysis in JSON format."""
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a code analysis expert. Provide concise, structured analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
+            async with self._request_semaphore:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "You are a code analysis expert. Provide concise, structured analysis."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3
+                )
             
             analysis_text = response.choices[0].message.content
             
@@ -57,12 +72,36 @@ Provide analysis in JSON format."""
                 'error': str(e)
             }
     
+    async def _truncate_to_token_budget(self, content: str) -> str:
+        """Trim source to AI_MAX_CODE_TOKENS tokens"""
+        encoding = await self._get_encoding()
+        if encoding is None:
+            return content[:settings.AI_MAX_CODE_TOKENS * settings.AI_CHARS_PER_TOKEN]
+        
+        tokens = encoding.encode(content, disallowed_special=())
+        if len(tokens) <= settings.AI_MAX_CODE_TOKENS:
+            return content
+        return encoding.decode(tokens[:settings.AI_MAX_CODE_TOKENS])
+    
+    async def _get_encoding(self) -> Optional[tiktoken.Encoding]:
+        """Load the tokenizer once; tiktoken may need to download it on first use"""
+        if not self._encoding_loaded:
+            # Concurrent file analyses wait for a single load attempt
+            async with self._encoding_lock:
+                if not self._encoding_loaded:
+                    try:
+                        self._encoding = await asyncio.to_thread(tiktoken.encoding_for_model, 'gpt-4')
+                    except Exception as e:
+                        logger.warning(f"Tokenizer unavailable, truncating by characters: {str(e)}")
+                    self._encoding_loaded = True
+        return self._encoding
+    
     async def analyze_requirement(self, prompt: str, code_maps: List[Dict]) -> Dict[str, Any]:
         """Analyze user requirement against code base"""
         try:
             # Prepare code context
             code_context = []
-            for cm in code_maps[:20]:  # Limit context
+            for cm in code_maps[:settings.AI_MAX_CONTEXT_FILES]:  # Limit context
                 code_context.append({
                     'file': cm['file_path'],
                     'type': cm['file_type'],
@@ -88,22 +127,23 @@ Provide detailed analysis in JSON format with keys:
 - dependencies: []
 - recommendations: []"""
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a software architecture expert. Analyze requirements and map them to code components."},
-                    {"role": "user", "content": analysis_prompt}
-                ],
-                temperature=0.3
-            )
+            async with self._request_semaphore:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "You are a software architecture expert. Analyze requirements and map them to code components."},
+                        {"role": "user", "content": analysis_prompt}
+                    ],
+                    temperature=0.3,
+                    response_format={"type": "json_object"}
+                )
             
             analysis_text = response.choices[0].message.content
             
             # Try to parse JSON response
-            import json
             try:
-                result = json.loads(analysis_text)
-            except:
+                result = orjson.loads(_FENCE.sub('', analysis_text.strip()))
+            except orjson.JSONDecodeError:
                 result = {
                     'analysis': analysis_text,
                     'affected_components': {
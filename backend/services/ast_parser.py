@@ -1,140 +1,292 @@
 import ast
+import asyncio
+import hashlib
+import inspect
 import json
 import logging
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict
+from itertools import chain
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from config import settings
+
+try:
+    from tree_sitter import Parser
+    from tree_sitter_languages import get_language
+except ImportError:  # no prebuilt grammars for this interpreter/platform
+    Parser = None
 
 logger = logging.getLogger(__name__)
 
+# Bump when the shape of parse results changes to invalidate cached entries
+_CACHE_VERSION = 2
+
+# Hoisted AST node types; the concrete ones are leaf classes, so hot paths
+# compare with `type(node) is ...` instead of walking the MRO in isinstance
+_FUNCTION = ast.FunctionDef
+_ASYNC_FUNCTION = ast.AsyncFunctionDef
+_CLASS = ast.ClassDef
+_IMPORT = ast.Import
+_IMPORT_FROM = ast.ImportFrom
+_EXPR_STMT = ast.Expr
+_CONSTANT = ast.Constant
+_NAME = ast.Name
+_EXPR = ast.expr
+_FUNCTION_TYPES = frozenset({_FUNCTION, _ASYNC_FUNCTION})
+
+_TS_LANGUAGES = {
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'tsx',
+}
+
+_PARSEABLE_SUFFIXES = frozenset({'.py', *_TS_LANGUAGES})
+
+_TS_QUERY = """
+(function_declaration) @function
+(generator_function_declaration) @function
+(variable_declarator name: (identifier) value: [(arrow_function) (function)]) @function
+(variable_declarator
+  name: (identifier)
+  value: (call_expression arguments: (arguments [(arrow_function) (function)]))) @function
+(class_declaration) @class
+(import_statement) @import
+(call_expression
+  function: (identifier) @_require
+  arguments: (arguments . (string) @require)
+  (#eq? @_require "require"))
+"""
+
+# Node types that only exist in the TypeScript grammars
+_TS_QUERY_TYPESCRIPT = """
+(abstract_class_declaration) @class
+"""
+
+# Fallback JS/TS extraction when tree-sitter is unavailable
+_JS_DEFINITION = re.compile(
+    r'\bfunction(?:\s*\*\s*|\s+)(?P<function>[A-Za-z_$][\w$]*)'
+    r'|\bconst\s+(?P<arrow>[A-Za-z_$][\w$]*)\s*=[^\n]*?=>'
+    r'|\bclass\s+(?P<cls>[A-Za-z_$][\w$]*)'
+)
+_JS_IMPORT = re.compile(r'^[ \t]*import\b[^\n]*', re.MULTILINE)
+_JS_MODULE_SOURCE = re.compile(r"""\bfrom\s+['"]([^'"]+)['"]|\brequire\(\s*['"]([^'"]+)['"]\s*\)""")
+
+def _count_lines(content: str) -> int:
+    """Count lines without materializing them; a trailing newline does not start a new line"""
+    if not content:
+        return 0
+    return content.count('\n') + (0 if content.endswith('\n') else 1)
+
+def _fast_docstring(node) -> Optional[str]:
+    """Docstring of a def/class node, equivalent to ast.get_docstring without its type checks"""
+    body = node.body
+    if not body:
+        return None
+    first = body[0]
+    if type(first) is not _EXPR_STMT:
+        return None
+    value = first.value
+    if type(value) is _CONSTANT and type(value.value) is str:
+        return inspect.cleandoc(value.value)
+    return None
+
+class _PyVisitor(ast.NodeVisitor):
+    """Indexes the definition and import nodes of a Python module by type.
+
+    Definitions and imports are statements, so expression subtrees are never
+    entered; this skips the bulk of the tree (names, constants, calls...).
+    """
+    
+    _indexed_types = frozenset({_FUNCTION, _ASYNC_FUNCTION, _CLASS, _IMPORT, _IMPORT_FROM})
+    
+    def __init__(self):
+        self.index = defaultdict(list)
+    
+    def visit(self, node):
+        node_type = type(node)
+        if node_type in self._indexed_types:
+            self.index[node_type].append(node)
+        self.generic_visit(node)
+    
+    def generic_visit(self, node):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, _EXPR):
+                continue
+            self.visit(child)
+
 class ASTParser:
     """AST-based code parser for Python and JavaScript"""
     
+    def __init__(self):
+        self.cache_dir = Path(settings.TEMP_REPO_PATH) / 'ast-cache'
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Parsing holds the GIL, so more threads than cores only adds contention
+        self._parse_semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        self._ts_languages = {}
+    
     async def parse_file(self, file_path: str) -> Dict[str, Any]:
         """Parse file and extract AST information"""
         file_path_obj = Path(file_path)
+        suffix = file_path_obj.suffix
         
-        if file_path_obj.suffix == '.py':
-            return await self._parse_python(file_path)
-        elif file_path_obj.suffix in ['.js', '.jsx', '.ts', '.tsx']:
-            return await self._parse_javascript(file_path)
-        else:
+        if suffix not in _PARSEABLE_SUFFIXES:
+            return self._empty_result()
+        
+        # Skip oversized files (e.g. minified bundles) without reading them
+        try:
+            if file_path_obj.stat().st_size > settings.MAX_FILE_SIZE:
+                return self._empty_result()
+        except OSError as e:
+            logger.error(f"Error reading {file_path}: {str(e)}")
             return self._empty_result()
+        
+        if suffix == '.py':
+            return await self._parse_python(file_path)
+        return await self._parse_javascript(file_path)
     
     async def _parse_python(self, file_path: str) -> Dict[str, Any]:
+        """Parse Python file in a worker thread"""
+        async with self._parse_semaphore:
+            return await asyncio.to_thread(self._parse_python_sync, file_path)
+    
+    def _parse_python_sync(self, file_path: str) -> Dict[str, Any]:
         """Parse Python file using AST"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            tree = ast.parse(content)
+            cache_path = self._cache_path(content)
+            if cache_path is not None:
+                cached = self._load_cached(cache_path)
+                if cached is not None:
+                    self.cache_hits += 1
+                    return cached
+            self.cache_misses += 1
+            
+            # Equivalent to ast.parse, minus the wrapper and without inheriting
+            # this module's __future__ flags
+            tree = compile(content, file_path, 'exec', flags=ast.PyCF_ONLY_AST, dont_inherit=True)
+            
+            visitor = _PyVisitor()
+            visitor.visit(tree)
+            index = visitor.index
             
             functions = []
+            for node in chain(index.get(_FUNCTION, ()), index.get(_ASYNC_FUNCTION, ())):
+                functions.append({
+                    'name': node.name,
+                    'line_start': node.lineno,
+                    'line_end': node.end_lineno,
+                    'args': [arg.arg for arg in node.args.args],
+                    'decorators': [d.id if type(d) is _NAME else str(d) for d in node.decorator_list],
+                    'docstring': _fast_docstring(node)
+                })
+            
             classes = []
-            imports = []
-            dependencies = []
+            for node in index.get(_CLASS, ()):
+                methods = [m.name for m in node.body if type(m) in _FUNCTION_TYPES]
+                classes.append({
+                    'name': node.name,
+                    'line_start': node.lineno,
+                    'line_end': node.end_lineno,
+                    'methods': methods,
+                    'bases': [b.id if type(b) is _NAME else str(b) for b in node.bases],
+                    'docstring': _fast_docstring(node)
+                })
             
-            for node in ast.walk(tree):
-                # Extract functions
-                if isinstance(node, ast.FunctionDef):
-                    functions.append({
-                        'name': node.name,
-                        'line_start': node.lineno,
-                        'line_end': node.end_lineno,
-                        'args': [arg.arg for arg in node.args.args],
-                        'decorators': [d.id if isinstance(d, ast.Name) else str(d) for d in node.decorator_list],
-                        'docstring': ast.get_docstring(node)
-                    })
-                
-                # Extract classes
-                elif isinstance(node, ast.ClassDef):
-                    methods = [m.name for m in node.body if isinstance(m, ast.FunctionDef)]
-                    classes.append({
-                        'name': node.name,
-                        'line_start': node.lineno,
-                        'line_end': node.end_lineno,
-                        'methods': methods,
-                        'bases': [b.id if isinstance(b, ast.Name) else str(b) for b in node.bases],
-                        'docstring': ast.get_docstring(node)
-                    })
-                
-                # Extract imports
-                elif isinstance(node, ast.Import):
-                    for alias in node.names:
-                        imports.append(alias.name)
-                        dependencies.append(alias.name.split('.')[0])
-                
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        imports.append(f"from {node.module}")
-                        dependencies.append(node.module.split('.')[0])
-            
-            line_count = len(content.split('\n'))
+            imports = set()
+            dependencies = set()
+            for node in index.get(_IMPORT, ()):
+                for alias in node.names:
+                    imports.add(alias.name)
+                    dependencies.add(alias.name.partition('.')[0])
             
-            return {
+            for node in index.get(_IMPORT_FROM, ()):
+                if node.module:
+                    imports.add(f"from {node.module}")
+                    dependencies.add(node.module.partition('.')[0])
+            
+            result = {
                 'ast_data': {
                     'type': 'python',
                     'parsed': True
                 },
                 'functions': functions,
                 'classes': classes,
-                'imports': list(set(imports)),
-                'dependencies': list(set(dependencies)),
-                'line_count': line_count
+                'imports': list(imports),
+                'dependencies': list(dependencies),
+                'line_count': _count_lines(content)
             }
+            
+            if cache_path is not None:
+                self._store_cached(cache_path, result)
+            
+            return result
         
         except Exception as e:
             logger.error(f"Error parsing Python file {file_path}: {str(e)}")
             return self._empty_result()
     
     async def _parse_javascript(self, file_path: str) -> Dict[str, Any]:
-        """Parse JavaScript/TypeScript file (simplified)"""
+        """Parse JavaScript/TypeScript file in a worker thread"""
+        async with self._parse_semaphore:
+            return await asyncio.to_thread(self._parse_javascript_sync, file_path)
+    
+    def _parse_javascript_sync(self, file_path: str) -> Dict[str, Any]:
+        """Parse JavaScript/TypeScript file with tree-sitter"""
+        if Parser is None:
+            return self._parse_javascript_lines(file_path)
+        
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            lines = content.split('\n')
+            language, query = self._ts_language(_TS_LANGUAGES[Path(file_path).suffix])
+            # Parsers are not thread-safe, so each worker thread gets its own
+            parser = Parser()
+            parser.set_language(language)
+            tree = parser.parse(content.encode('utf-8'))
+            
             functions = []
             classes = []
             imports = []
             dependencies = []
             
-            for i, line in enumerate(lines, 1):
-                # Extract functions (simplified regex-based)
-                if 'function ' in line or '=>' in line:
-                    if 'function ' in line:
-                        func_name = line.split('function ')[1].split('(')[0].strip()
-                    elif 'const ' in line and '=>' in line:
-                        func_name = line.split('const ')[1].split('=')[0].strip()
-                    else:
-                        func_name = 'anonymous'
-                    
-                    if func_name and func_name != 'anonymous':
+            # matches() reports each pattern match once, whereas captures()
+            # repeats a node per alternative it matched (HOC-wrapped arrows)
+            for _, match in query.matches(tree.root_node):
+                for capture, node in match.items():
+                    if capture == 'function':
                         functions.append({
-                            'name': func_name,
-                            'line_start': i,
-                            'line_end': i,  # Simplified
+                            'name': node.child_by_field_name('name').text.decode('utf-8'),
+                            'line_start': node.start_point[0] + 1,
+                            'line_end': node.end_point[0] + 1,
                             'type': 'function'
                         })
-                
-                # Extract classes
-                if 'class ' in line:
-                    class_name = line.split('class ')[1].split(' ')[0].split('{')[0].strip()
-                    if class_name:
+                    
+                    elif capture == 'class':
                         classes.append({
-                            'name': class_name,
-                            'line_start': i,
-                            'line_end': i  # Simplified
+                            'name': node.child_by_field_name('name').text.decode('utf-8'),
+                            'line_start': node.start_point[0] + 1,
+                            'line_end': node.end_point[0] + 1
                         })
-                
-                # Extract imports
-                if 'import ' in line:
-                    imports.append(line.strip())
-                    # Extract package name
-                    if 'from ' in line:
-                        pkg = line.split('from ')[1].strip().strip(';').strip('"').strip("'")
-                        dependencies.append(pkg.split('/')[0])
-                    elif "require('" in line or 'require("' in line:
-                        pkg = line.split('require(')[1].split(')')[0].strip('"').strip("'")
+                    
+                    elif capture == 'import':
+                        imports.append(' '.join(node.text.decode('utf-8').split()))
+                        source = node.child_by_field_name('source')
+                        if source is not None:
+                            pkg = source.text.decode('utf-8')[1:-1]
+                            dependencies.append(pkg.split('/')[0])
+                    
+                    elif capture == 'require':
+                        pkg = node.text.decode('utf-8')[1:-1]
                         dependencies.append(pkg.split('/')[0])
             
             return {
@@ -146,13 +298,106 @@ class ASTParser:
                 'classes': classes,
                 'imports': list(set(imports)),
                 'dependencies': list(set(dependencies)),
-                'line_count': len(lines)
+                'line_count': _count_lines(content)
+            }
+        
+        except Exception as e:
+            logger.error(f"Error parsing JavaScript file {file_path}: {str(e)}")
+            return self._empty_result()
+    
+    def _ts_language(self, name: str):
+        """Load tree-sitter grammar and compiled query once per language"""
+        cached = self._ts_languages.get(name)
+        if cached is None:
+            language = get_language(name)
+            source = _TS_QUERY if name == 'javascript' else _TS_QUERY + _TS_QUERY_TYPESCRIPT
+            cached = self._ts_languages[name] = (language, language.query(source))
+        return cached
+    
+    def _parse_javascript_lines(self, file_path: str) -> Dict[str, Any]:
+        """Parse JavaScript/TypeScript file line by line (fallback without tree-sitter)"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            
+            functions = []
+            classes = []
+            
+            # Matches arrive in order, so line numbers are counted incrementally
+            line = 1
+            last_pos = 0
+            for match in _JS_DEFINITION.finditer(content):
+                line += content.count('\n', last_pos, match.start())
+                last_pos = match.start()
+                if match.lastgroup == 'cls':
+                    classes.append({
+                        'name': match.group('cls'),
+                        'line_start': line,
+                        'line_end': line  # Simplified
+                    })
+                else:
+                    functions.append({
+                        'name': match.group(match.lastgroup),
+                        'line_start': line,
+                        'line_end': line,  # Simplified
+                        'type': 'function'
+                    })
+            
+            imports = [m.group().strip() for m in _JS_IMPORT.finditer(content)]
+            dependencies = [
+                (m.group(1) or m.group(2)).split('/')[0]
+                for m in _JS_MODULE_SOURCE.finditer(content)
+            ]
+            
+            return {
+                'ast_data': {
+                    'type': 'javascript',
+                    'parsed': True
+                },
+                'functions': functions,
+                'classes': classes,
+                'imports': list(set(imports)),
+                'dependencies': list(set(dependencies)),
+                'line_count': _count_lines(content)
             }
         
         except Exception as e:
             logger.error(f"Error parsing JavaScript file {file_path}: {str(e)}")
             return self._empty_result()
     
+    def _cache_path(self, content: str) -> Optional[Path]:
+        """Return cache location for source content, or None if it should not be cached"""
+        if len(content) > settings.MAX_FILE_SIZE:
+            return None
+        key = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        version = f"{sys.version_info.major}{sys.version_info.minor}"
+        return self.cache_dir / f"{key}_{version}_v{_CACHE_VERSION}.json"
+    
+    def _load_cached(self, cache_path: Path) -> Optional[Dict[str, Any]]:
+        """Load cached parse result, treating unreadable entries as misses"""
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable AST cache entry {cache_path}: {str(e)}")
+            return None
+    
+    def _store_cached(self, cache_path: Path, result: Dict[str, Any]):
+        """Write parse result atomically so concurrent readers never see partial files"""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(result, f)
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write AST cache entry {cache_path}: {str(e)}")
+    
     def _empty_result(self) -> Dict[str, Any]:
         """Return empty result structure"""
         return {
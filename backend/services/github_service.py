@@ -1,7 +1,7 @@
+import asyncio
 import os
 import shutil
 from pathlib import Path
-from git import Repo
 from config import settings
 import logging
 
@@ -19,10 +19,20 @@ class GitHubService:
             
             # Remove if exists
             if repo_path.exists():
-                shutil.rmtree(repo_path)
+                await asyncio.to_thread(shutil.rmtree, repo_path, ignore_errors=True)
             
             logger.info(f"Cloning repository: {github_url}")
-            Repo.clone_from(github_url, repo_path)
+            # Only the working tree is analyzed, so skip history entirely
+            proc = await asyncio.create_subprocess_exec(
+                'git', 'clone', '--depth=1', '--filter=blob:none', '--single-branch',
+                '--', github_url, str(repo_path),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                env={**os.environ, 'GIT_TERMINAL_PROMPT': '0'}
+            )
+            _, stderr = await proc.communicate()
+            if proc.returncode != 0:
+                raise Exception(f"git clone exited with {proc.returncode}: {stderr.decode(errors='replace').strip()}")
             
             return str(repo_path)
         except Exception as e:
@@ -33,4 +43,4 @@ class GitHubService:
         """Clean up cloned repository"""
         repo_path = self.temp_path / project_id
         if repo_path.exists():
-            shutil.rmtree(repo_path)
+            shutil.rmtree(repo_path, ignore_errors=True)
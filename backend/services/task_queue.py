@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List
+
+logger = logging.getLogger(__name__)
+
+class TaskQueue:
+    """In-process job queue drained by a fixed pool of worker coroutines"""
+    
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker_tasks: List[asyncio.Task] = []
+    
+    async def start(self):
+        """Start worker coroutines on the running event loop"""
+        self._worker_tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        logger.info(f"Task queue started with {self.workers} workers")
+    
+    async def stop(self):
+        """Cancel workers; jobs still queued are dropped"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        if self.pending():
+            logger.warning(f"Task queue stopped with {self.pending()} jobs pending")
+    
+    async def enqueue(self, job: Callable[..., Awaitable[Any]], *args: Any):
+        """Schedule job(*args) to run on the next free worker"""
+        await self._queue.put((job, args))
+        logger.info(f"Queued {job.__name__}; {self.pending()} jobs waiting for a worker")
+    
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize()
+    
+    async def _worker(self):
+        while True:
+            job, args = await self._queue.get()
+            try:
+                await job(*args)
+            except Exception as e:
+                logger.error(f"Background job {job.__name__} failed: {str(e)}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("tree_sitter_languages")
+
+from services.ast_parser import ASTParser
+
+
+def parse_js(tmp_path, source, suffix='.js'):
+    path = tmp_path / f"module{suffix}"
+    path.write_text(source, encoding='utf-8')
+    return ASTParser()._parse_javascript_sync(str(path))
+
+
+@pytest.mark.parametrize("source", [
+    "const A = f(() => 1);",
+    "const A = React.forwardRef((p, r) => null);",
+    "const A = f(() => 1, () => 2);",
+    "const A = memo(function () { return null; });",
+])
+def test_hoc_wrapped_component_reported_once(tmp_path, source):
+    result = parse_js(tmp_path, source)
+    assert [f['name'] for f in result['functions']] == ['A']
+
+
+def test_extracts_definitions_and_dependencies(tmp_path):
+    source = (
+        "import React from 'react';\n"
+        "const path = require('path/posix');\n"
+        "function load() {}\n"
+        "const render = () => null;\n"
+        "class Widget {}\n"
+    )
+    result = parse_js(tmp_path, source)
+    assert sorted(f['name'] for f in result['functions']) == ['load', 'render']
+    assert [c['name'] for c in result['classes']] == ['Widget']
+    assert result['imports'] == ["import React from 'react';"]
+    assert sorted(result['dependencies']) == ['path', 'react']
+    assert result['line_count'] == 5
+
+
+def test_typescript_abstract_class(tmp_path):
+    result = parse_js(tmp_path, "abstract class Base {}\n", suffix='.ts')
+    assert [c['name'] for c in result['classes']] == ['Base']
@@ -0,0 +1,102 @@
+import asyncio
+
+import mongomock.collection
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DuplicateKeyError
+
+import server
+
+URL = "https://github.com/example/repo"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = AsyncMongoMockClient(tz_aware=True)['test']
+    monkeypatch.setattr(server, 'db', database)
+    return database
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    jobs = []
+
+    async def enqueue(job, *args):
+        jobs.append((job, args))
+
+    monkeypatch.setattr(server.task_queue, 'enqueue', enqueue)
+    return jobs
+
+
+@pytest.fixture
+def client():
+    # Not used as a context manager, so startup hooks (indexes, workers) don't run
+    return TestClient(server.app)
+
+
+def seed(collection, *docs):
+    asyncio.run(collection.insert_many(list(docs)))
+
+
+def post_project(client):
+    response = client.post('/api/projects', json={'name': 'repo', 'github_url': URL})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_new_url_creates_and_queues_project(db, queued, client):
+    project = post_project(client)
+
+    assert project['status'] == 'analyzing'
+    assert queued == [(server.analyze_project, (project['id'],))]
+    assert asyncio.run(db.projects.count_documents({'github_url': URL})) == 1
+
+
+@pytest.mark.parametrize('status', ['analyzing', 'completed'])
+def test_existing_project_is_returned_without_queueing(db, queued, client, status):
+    seed(db.projects, {'id': 'existing', 'name': 'repo', 'github_url': URL, 'status': status})
+    seed(db.code_maps, {'id': 'cm', 'project_id': 'existing', 'file_path': 'a.py'})
+
+    project = post_project(client)
+
+    assert project['id'] == 'existing'
+    assert project['status'] == status
+    assert queued == []
+    assert asyncio.run(db.projects.count_documents({})) == 1
+    assert asyncio.run(db.code_maps.count_documents({'project_id': 'existing'})) == 1
+
+
+def test_failed_project_is_claimed_and_requeued(db, queued, client):
+    seed(db.projects, {'id': 'failed', 'name': 'repo', 'github_url': URL, 'status': 'failed'})
+    seed(
+        db.code_maps,
+        {'id': 'partial', 'project_id': 'failed', 'file_path': 'a.py'},
+        {'id': 'other', 'project_id': 'unrelated', 'file_path': 'a.py'},
+    )
+
+    project = post_project(client)
+
+    assert project['id'] == 'failed'
+    assert project['status'] == 'analyzing'
+    assert queued == [(server.analyze_project, ('failed',))]
+    remaining = asyncio.run(db.code_maps.distinct('id'))
+    assert remaining == ['other']
+
+    # A second resubmit sees the claimed row as in flight
+    post_project(client)
+    assert len(queued) == 1
+
+
+def test_lost_upsert_race_returns_winner(db, queued, client, monkeypatch):
+    seed(db.projects, {'id': 'winner', 'name': 'repo', 'github_url': URL, 'status': 'analyzing'})
+
+    def raise_duplicate(self, *args, **kwargs):
+        raise DuplicateKeyError("E11000 duplicate key error")
+
+    monkeypatch.setattr(mongomock.collection.Collection, 'update_one', raise_duplicate)
+
+    project = post_project(client)
+
+    assert project['id'] == 'winner'
+    assert queued == []
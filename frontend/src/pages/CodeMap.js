@@ -34,7 +34,7 @@ const CodeMap = () => {
       setLoading(true);
       const [projectRes, codeMapsRes, summaryRes] = await Promise.all([
         projectService.getById(projectId),
-        codeMapService.getByProject(projectId),
+        codeMapService.getIndex(projectId),
         codeMapService.getSummary(projectId)
       ]);
       
@@ -80,9 +80,15 @@ const CodeMap = () => {
     return convertToArray(tree);
   };
 
-  const onSelect = (selectedKeys, info) => {
+  const onSelect = async (selectedKeys, info) => {
     if (info.node.isFile && info.node.data) {
-      setSelectedFile(info.node.data);
+      // The tree only holds the file listing; load the full code map on demand
+      try {
+        const fileRes = await codeMapService.getFile(projectId, info.node.data.file_path);
+        setSelectedFile(fileRes.data);
+      } catch (error) {
+        console.error('Error loading file:', error);
+      }
     }
   };
 
@@ -18,6 +18,8 @@ export const projectService = {
 
 export const codeMapService = {
   getByProject: (projectId) => api.get(`/code-maps/${projectId}`),
+  getIndex: (projectId) => api.get(`/code-maps/${projectId}/index`),
+  getFile: (projectId, path) => api.get(`/code-maps/${projectId}/file`, { params: { path } }),
   getSummary: (projectId) => api.get(`/code-maps/${projectId}/summary`),
 };
 